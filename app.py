@@ -1,8 +1,17 @@
 import streamlit as st
 import pandas as pd
-import requests
-import time
-import json
+import csv
+import io
+import shelve
+import threading
+
+from fetcher import create_session, format_result, run_batch
+
+MAX_WORKERS = 32  # also the connection pool size, so workers never wait on a socket
+CACHE_PATH = ".subscan_cache_raw"
+UI_REFRESH_SECONDS = 0.25
+DISPLAY_ROWS = 1000
+RESULT_COLUMNS = ["Tx Hash", "Status", "Sender", "From", "To", "Transfer Amount", "Estimated Fee", "Used Fee"]
 
 # --- Page Config ---
 st.set_page_config(page_title="Polkadot Subscan Fetcher", page_icon="🪙", layout="wide")
@@ -22,144 +31,95 @@ st.markdown("""
 st.sidebar.header("Configuration")
 api_key = st.sidebar.text_input("Subscan API Key (Optional)", type="password")
 sleep_time = st.sidebar.slider("Seconds between requests", 0.1, 2.0, 0.4)
+max_workers = st.sidebar.slider("Parallel requests", 1, MAX_WORKERS, 16)
+
+# --- Helper: Shared HTTP Session (one pool for all browser sessions) ---
+@st.cache_resource
+def get_session():
+    return create_session(MAX_WORKERS)
+
+# --- Helper: Load CSV ---
+# Cached on the file bytes so widget changes don't re-parse the upload; dtype=str skips type inference.
+@st.cache_data
+def load_csv(file_bytes):
+    return pd.read_csv(io.BytesIO(file_bytes), dtype=str)
 
-# --- Helper: Format DOT ---
-def format_dot(raw_amount, decimals=10):
-    try:
-        val = float(raw_amount) / (10 ** decimals)
-        formatted_val = f"{val:,.10f}".rstrip('0').rstrip('.')
-        return f"{formatted_val} DOT"
-    except:
-        return None
-
-# --- Helper: Extract Address from Param ---
-def extract_address(value):
-    # Sometimes 'dest' is just a string, sometimes it's a dict like {'Id': '...'}
-    if isinstance(value, dict):
-        return value.get('Id', str(value))
-    return str(value)
+# --- Helper: Lock for the On-Disk Tx Cache (shared by all browser sessions) ---
+@st.cache_resource
+def get_cache_lock():
+    return threading.Lock()
 
 # --- Main Logic ---
 uploaded_file = st.file_uploader("Upload your CSV file", type=["csv"])
 
 if uploaded_file is not None:
-    df = pd.read_csv(uploaded_file)
+    df = load_csv(uploaded_file.getvalue())
     st.dataframe(df.head())
 
     columns = df.columns.tolist()
     hash_col = st.selectbox("Select Transaction Hash Column", columns)
 
     if st.button("Fetch Data"):
-        results = []
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        headers = {"Content-Type": "application/json", "User-Agent": "StreamlitApp"}
-        if api_key: headers["X-API-Key"] = api_key
+        headers = {"X-API-Key": api_key} if api_key else None
 
-        total_tx = len(df)
+        session = get_session()
         
-        for index, row in df.iterrows():
-            tx_hash = str(row[hash_col]).strip()
-            url = "https://polkadot.api.subscan.io/api/scan/extrinsic"
-            
-            # Init variables
-            est_fee = used_fee = transfer_amount = None
-            sender = from_addr = to_addr = None
-            status_msg = "Pending"
-
-            try:
-                response = requests.post(url, json={"hash": tx_hash}, headers=headers)
-                data = response.json()
-                
-                if response.status_code == 200 and data.get('message') == 'Success':
-                    ex_data = data.get('data', {})
-                    
-                    if ex_data:
-                        # --- 1. Get Sender (Top Level) ---
-                        sender = ex_data.get('account_id', 'N/A')
-
-                        # --- 2. Get Fees ---
-                        est_fee = format_dot(ex_data.get('fee', '0'))
-                        used_fee = format_dot(ex_data.get('fee_used', '0'))
-
-                        # --- 3. Get Amount, From, To (Robust Logic) ---
-                        
-                        # PLAN A: Check 'transfer' object (Simple transfers)
-                        transfer_obj = ex_data.get('transfer')
-                        
-                        if transfer_obj:
-                            # Amount
-                            raw = transfer_obj.get('amount')
-                            transfer_amount = format_dot(raw)
-                            # From/To
-                            from_addr = transfer_obj.get('from')
-                            to_addr = transfer_obj.get('to')
-                            
-                        # PLAN B: Check 'params' (Complex transfers like transfer_allow_death)
-                        else:
-                            # Default 'From' to Sender if not found elsewhere
-                            from_addr = sender 
-                            
-                            params = ex_data.get('params', [])
-                            found_val = False
-                            
-                            for p in params:
-                                name = p.get('name')
-                                value = p.get('value')
-                                
-                                # Find Amount
-                                if name == 'value':
-                                    transfer_amount = format_dot(value)
-                                    found_val = True
-                                
-                                # Find Destination (To)
-                                if name == 'dest':
-                                    to_addr = extract_address(value)
-
-                            if not found_val:
-                                transfer_amount = "N/A"
-                                if not to_addr: to_addr = "N/A"
-
-                        status_msg = "Success"
-                    else:
-                        status_msg = "Not Found"
-                else:
-                    status_msg = f"API Error: {data.get('message')}"
-
-            except Exception as e:
-                status_msg = f"Error: {str(e)}"
-
-            results.append({
-                "Tx Hash": tx_hash,
-                "Sender": sender,
-                "From": from_addr,
-                "To": to_addr,
-                "Transfer Amount": transfer_amount,
-                "Estimated Fee": est_fee,
-                "Used Fee": used_fee,
-                "Status": status_msg
-            })
-
-            progress_bar.progress((index + 1) / total_tx)
-            status_text.text(f"Processing {index + 1}/{total_tx}...")
-            time.sleep(sleep_time)
+        hashes = df[hash_col].astype(str).str.strip().tolist()
+        unique_hashes = list(dict.fromkeys(hashes))
+        
+        # Reuse successful lookups from previous runs
+        results_by_hash = {}
+        with get_cache_lock(), shelve.open(CACHE_PATH) as tx_cache:
+            for tx_hash in unique_hashes:
+                cached = tx_cache.get(tx_hash)
+                if cached and cached["Status"] == "Success":
+                    results_by_hash[tx_hash] = cached
+        
+        to_fetch = [tx_hash for tx_hash in unique_hashes if tx_hash not in results_by_hash]
+
+        # Progress counts cache hits as already done, so it's measured against every unique hash
+        cached_count = len(results_by_hash)
+        total_tx = len(unique_hashes)
+
+        def show_progress(done, total):
+            progress_bar.progress((cached_count + done) / total_tx)
+            status_text.text(f"Processing {cached_count + done}/{total_tx}...")
+
+        fetched = run_batch(to_fetch, session, max_workers, sleep_time, headers, show_progress, UI_REFRESH_SECONDS)
+        results_by_hash.update(fetched)
+        progress_bar.progress(1.0)
+
+        # Format each distinct tx once (before caching, so a row that can't be formatted is never saved)
+        formatted_by_hash = {tx_hash: format_result(result) for tx_hash, result in results_by_hash.items()}
+
+        with get_cache_lock(), shelve.open(CACHE_PATH) as tx_cache:
+            for result in fetched.values():
+                if result["Status"] == "Success":
+                    tx_cache[result["Tx Hash"]] = result
 
         status_text.success("Done!")
-        res_df = pd.DataFrame(results)
-        
-        # Reorder columns for better readability
-        cols = ["Tx Hash", "Status", "Sender", "From", "To", "Transfer Amount", "Estimated Fee", "Used Fee"]
-        # Only use columns that actually exist (in case of error)
-        cols = [c for c in cols if c in res_df.columns]
-        res_df = res_df[cols]
+
+        # Stream rows to the CSV in upload order
+        csv_buffer = io.StringIO()
+        writer = csv.DictWriter(csv_buffer, fieldnames=RESULT_COLUMNS)
+        writer.writeheader()
+        for tx_hash in hashes:
+            writer.writerow(formatted_by_hash[tx_hash])
+
+        # Only the first DISPLAY_ROWS rows are materialized as a DataFrame
+        res_df = pd.DataFrame([formatted_by_hash[tx_hash] for tx_hash in hashes[:DISPLAY_ROWS]], columns=RESULT_COLUMNS)
 
         st.subheader("Results")
         st.dataframe(res_df)
+        if len(hashes) > DISPLAY_ROWS:
+            st.caption(f"Showing the first {DISPLAY_ROWS} of {len(hashes)} rows. Download the CSV for all of them.")
         
         st.download_button(
             "Download CSV",
-            res_df.to_csv(index=False).encode('utf-8'),
+            csv_buffer.getvalue().encode('utf-8'),
             "polkadot_full_data.csv",
             "text/csv"
         )
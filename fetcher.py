@@ -0,0 +1,243 @@
+import time
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from decimal import Decimal
+from functools import lru_cache
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# orjson parses Subscan responses noticeably faster; fall back to stdlib json
+try:
+    import orjson
+    parse_json = orjson.loads
+    JSON_DECODE_ERRORS = (orjson.JSONDecodeError, json.JSONDecodeError)
+except ImportError:
+    parse_json = json.loads
+    JSON_DECODE_ERRORS = (json.JSONDecodeError,)
+
+SUBSCAN_URL = "https://polkadot.api.subscan.io/api/scan/extrinsic"
+_DOT_SCALE = 10 ** 10
+MAX_RETRY_WAIT = 10  # seconds; caps server-supplied Retry-After
+
+# --- Helper: HTTP Session (keeps connections alive across requests) ---
+def create_session(pool_size):
+    session = requests.Session()
+    # Static headers live on the session; only the per-user API key is sent per call
+    session.headers.update({"Content-Type": "application/json", "User-Agent": "StreamlitApp"})
+    # 5xx and connection errors are retried here; 429 is left to post_with_retry so it goes through the rate limiter
+    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=[500, 502, 503, 504], allowed_methods=None, raise_on_status=False, respect_retry_after_header=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retries)
+    session.mount("https://", adapter)
+    return session
+
+# --- Helper: Format DOT ---
+# Integer maths keeps full precision on 128-bit balances; fee values repeat a lot, hence the cache.
+def format_dot(raw_amount, decimals=10):
+    # Only scalars can be cached (and be amounts); anything else, e.g. a dict param, isn't formattable
+    if not isinstance(raw_amount, (str, int, float)):
+        return None
+    return _format_dot_cached(raw_amount, decimals)
+
+@lru_cache(maxsize=4096)
+def _format_dot_cached(raw_amount, decimals):
+    try:
+        raw = int(raw_amount)
+    except OverflowError:
+        # inf from stdlib json (1e400 / Infinity) isn't an amount
+        return None
+    except (TypeError, ValueError):
+        # Scientific notation / decimal strings ("1.5e10"); Decimal keeps them exact, unlike float
+        try:
+            raw = int(Decimal(raw_amount))
+        except (TypeError, ValueError, ArithmeticError):
+            return None
+
+    scale = _DOT_SCALE if decimals == 10 else 10 ** decimals
+    whole, frac = divmod(abs(raw), scale)
+    formatted_val = f"{'-' if raw < 0 else ''}{whole:,}"
+    if frac:
+        formatted_val += f".{frac:0{decimals}d}".rstrip('0')
+    return f"{formatted_val} DOT"
+
+# --- Helper: Format One Result Row for Output ---
+def format_result(result):
+    row = {col: result[col] for col in ("Tx Hash", "Status", "Sender", "From", "To")}
+    transfer = result["raw_transfer_amount"]
+    row["Transfer Amount"] = transfer if transfer == "N/A" else format_dot(transfer)
+    row["Estimated Fee"] = format_dot(result["raw_est_fee"])
+    row["Used Fee"] = format_dot(result["raw_used_fee"])
+    return row
+
+# --- Helper: Normalize Address ---
+# Senders/recipients repeat across rows; the cache hands back one shared string per address.
+def normalize_address(value):
+    if value is None:
+        return None
+    # Unhashable shapes (dicts, lists) are turned into a stable string before the cached lookup
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value, sort_keys=True)
+    return _shared_address(str(value))
+
+@lru_cache(maxsize=8192)
+def _shared_address(address):
+    return address
+
+# --- Helper: Extract Address from Param ---
+def extract_address(value):
+    # Sometimes 'dest' is just a string, sometimes it's a dict like {'Id': '...'}
+    if isinstance(value, dict):
+        value = value.get('Id', value)
+    return normalize_address(value)
+
+# --- Helper: Pull the Fields We Use out of an Extrinsic ---
+def extract_fields(ex_data):
+    return (
+        normalize_address(ex_data.get('account_id', 'N/A')),
+        ex_data.get('fee', '0'),
+        ex_data.get('fee_used', '0'),
+        ex_data.get('transfer'),
+        ex_data.get('params') or [],
+    )
+
+# --- Helper: POST with Retry ---
+# 5xx and connection errors are retried by urllib3 inside the adapter; this loop only handles
+# 429 rate limiting, so every retry waits for a limiter slot and the total retry budget stays bounded.
+def post_with_retry(session, url, payload, headers=None, limiter=None, max_tries=3):
+    for attempt in range(max_tries):
+        if limiter: limiter.wait()
+        response = session.post(url, json=payload, headers=headers, timeout=(3, 10))
+        if response.status_code != 429 or attempt == max_tries - 1:
+            return response
+
+        # Honor Retry-After (seconds form only), capped so one reply can't park a worker
+        try:
+            delay = float(response.headers.get("Retry-After", ""))
+        except ValueError:
+            delay = 0.2 * 2 ** attempt
+        time.sleep(max(0.0, min(delay, MAX_RETRY_WAIT)))
+
+# --- Helper: Rate Limiter (spaces request starts across worker threads) ---
+class RateLimiter:
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        with self.lock:
+            slot = max(self.next_slot, time.monotonic())
+            self.next_slot = slot + self.interval
+        time.sleep(max(0, slot - time.monotonic()))
+
+# --- Fetch One Extrinsic ---
+# Runs in a worker thread, so it must not call any st.* functions.
+def fetch_extrinsic(session, tx_hash, limiter=None, headers=None):
+    # Init variables (amounts stay raw planck values; formatted after the fetch)
+    raw_est_fee = raw_used_fee = raw_transfer_amount = None
+    sender = from_addr = to_addr = None
+    status_msg = "Pending"
+
+    try:
+        # Only the extrinsic's own events are needed; keeps the response body small
+        payload = {"hash": tx_hash, "only_extrinsic_event": True}
+        response = post_with_retry(session, SUBSCAN_URL, payload, headers, limiter)
+        if response.status_code != 200:
+            # Skip parsing error bodies; rate-limit and proxy pages can be large HTML
+            status_msg = f"HTTP {response.status_code}"
+        else:
+            data = parse_json(response.content)
+
+            if data.get('message') == 'Success':
+                ex_data = data.get('data', {})
+
+                if ex_data:
+                    # --- 1. Get Sender (Top Level) + Raw Fields ---
+                    sender, raw_est_fee, raw_used_fee, transfer_obj, params = extract_fields(ex_data)
+
+                    # --- 2. Get Amount, From, To (Robust Logic) ---
+
+                    # PLAN A: Check 'transfer' object (Simple transfers)
+                    if transfer_obj:
+                        # Amount
+                        raw_transfer_amount = transfer_obj.get('amount')
+                        # From/To
+                        from_addr = normalize_address(transfer_obj.get('from'))
+                        to_addr = normalize_address(transfer_obj.get('to'))
+
+                    # PLAN B: Check 'params' (Complex transfers like transfer_allow_death)
+                    else:
+                        # Default 'From' to Sender if not found elsewhere
+                        from_addr = sender
+
+                        # One pass over params, then O(1) lookups by name
+                        param_map = {p.get('name'): p.get('value') for p in params}
+
+                        # Find Destination (To)
+                        if 'dest' in param_map:
+                            to_addr = extract_address(param_map['dest'])
+
+                        # Find Amount
+                        if 'value' in param_map:
+                            raw_transfer_amount = param_map['value']
+                        else:
+                            raw_transfer_amount = "N/A"
+                            if not to_addr: to_addr = "N/A"
+
+                    status_msg = "Success"
+                else:
+                    status_msg = "Not Found"
+            else:
+                status_msg = f"API Error: {data.get('message')}"
+
+    except requests.Timeout:
+        status_msg = "Error: Timeout"
+    except requests.RequestException as e:
+        status_msg = f"Error: {str(e)}"
+    except JSON_DECODE_ERRORS:
+        status_msg = "Error: Invalid JSON response"
+    except ValueError:
+        # Other parse failures, e.g. stdlib json on invalid UTF-8 or over-long integers
+        status_msg = "Error: Unreadable response"
+    except (AttributeError, TypeError):
+        status_msg = "Error: Unexpected response format"
+
+    return {
+        "Tx Hash": tx_hash,
+        "Sender": sender,
+        "From": from_addr,
+        "To": to_addr,
+        "raw_transfer_amount": raw_transfer_amount,
+        "raw_est_fee": raw_est_fee,
+        "raw_used_fee": raw_used_fee,
+        "Status": status_msg
+    }
+
+# --- Fetch Many Extrinsics ---
+# Requests overlap across `concurrency` workers while the limiter keeps starts `interval` seconds apart.
+# `on_progress(done, total)` is called from the calling thread, at most every `progress_interval` seconds.
+def run_batch(hashes, session, concurrency, interval, headers=None, on_progress=None, progress_interval=0.25):
+    limiter = RateLimiter(interval)
+    results_by_hash = {}
+    total = len(hashes)
+    last_update = time.monotonic()
+
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = [executor.submit(fetch_extrinsic, session, tx_hash, limiter, headers) for tx_hash in hashes]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            results_by_hash[result["Tx Hash"]] = result
+
+            if on_progress and (done == total or time.monotonic() - last_update > progress_interval):
+                on_progress(done, total)
+                last_update = time.monotonic()
+    except BaseException:
+        # Streamlit stops/reruns by raising from on_progress; drop queued lookups instead of waiting on them
+        executor.shutdown(wait=False, cancel_futures=True)
+        raise
+    executor.shutdown()
+
+    return results_by_hash